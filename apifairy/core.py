@@ -4,7 +4,7 @@ import sys
 
 from apispec import APISpec
 from apispec.ext.marshmallow import MarshmallowPlugin
-from flask import current_app, Blueprint, render_template
+from flask import current_app, has_app_context, Blueprint, render_template
 from flask_marshmallow import fields
 try:
     from flask_marshmallow import sqla
@@ -15,9 +15,87 @@ try:
 except ImportError:  # pragma: no cover
     HTTPBasicAuth = None
     HTTPTokenAuth = None
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
 
+from apifairy.decorators import _is_struct
 from apifairy.exceptions import ValidationError
 
+_struct_media_types = {
+    'form': 'application/x-www-form-urlencoded',
+    'json': 'application/json',
+}
+# the OpenAPI 3.0 form of a schema that only accepts null
+_NULL_SCHEMA = {'nullable': True, 'enum': [None]}
+
+
+def _openapi_schema(schema):
+    """Convert a JSON Schema generated by msgspec to OpenAPI 3.0 form."""
+    if not isinstance(schema, dict):
+        return schema
+    if 'prefixItems' in schema or schema.get('items') is False:
+        raise ValueError('Tuple types cannot be expressed in OpenAPI 3.0')
+    result = {}
+    for key, value in schema.items():
+        if key == 'properties':
+            value = {name: _openapi_schema(prop)
+                     for name, prop in value.items()}
+        elif key in ['items', 'additionalProperties', 'not']:
+            value = _openapi_schema(value)
+        elif key in ['anyOf', 'allOf', 'oneOf']:
+            value = [_openapi_schema(option) for option in value]
+        elif key == 'examples':
+            key, value = 'example', value[0]
+        elif key in ['exclusiveMinimum', 'exclusiveMaximum'] and \
+                not isinstance(value, bool):
+            result[key] = True
+            key = 'minimum' if key == 'exclusiveMinimum' else 'maximum'
+        elif key == 'contentEncoding' and value == 'base64':
+            key, value = 'format', 'byte'
+        elif key == 'const':
+            key, value = 'enum', [value]
+        result[key] = value
+    if result.get('required') == []:
+        # OpenAPI 3.0 does not allow empty required lists
+        del result['required']
+
+    # OpenAPI 3.0 has no null type, only the nullable flag
+    if 'type' in result:
+        types = result.pop('type')
+        types = [types] if isinstance(types, str) else types
+        non_null = [t for t in types if t != 'null']
+        if len(non_null) < len(types):
+            result['nullable'] = True
+        if len(non_null) == 1:
+            result['type'] = non_null[0]
+        elif non_null:
+            result['anyOf'] = [{'type': t} for t in non_null]
+        else:
+            result.update(_NULL_SCHEMA)
+    for key in ['anyOf', 'oneOf']:
+        if key not in result:
+            continue
+        # null options have already been converted by the recursion above
+        options = [option for option in result[key]
+                   if option != _NULL_SCHEMA]
+        if len(options) == len(result[key]):
+            continue
+        del result[key]
+        result['nullable'] = True
+        if len(options) == 1:
+            result = {**options[0], **result}
+        elif options:
+            result[key] = options
+        else:
+            result.update(_NULL_SCHEMA)
+
+    # a reference cannot have sibling keywords in OpenAPI 3.0
+    if '$ref' in result and len(result) > 1:
+        result['allOf'] = [{'$ref': result.pop('$ref')}]
+    return result
+
 
 class APIFairy:
     def __init__(self, app=None, title='No title', version='No version',
@@ -41,7 +119,10 @@ class APIFairy:
         if self.apispec_path:
             @bp.route(self.apispec_path)
             def json():
-                return dumps(self.apispec), 200, \
+                cache = self._apispec_cache()
+                if 'json' not in cache:
+                    cache['json'] = dumps(cache['apispec'])
+                return cache['json'], 200, \
                     {'Content-Type': 'application/json'}
 
         if self.ui_path:
@@ -70,11 +151,32 @@ class APIFairy:
 
     @property
     def apispec(self):
-        if self._apispec is None:
-            self._apispec = self._generate_apispec().to_dict()
+        # inside an application context this walks and sorts all the
+        # application's rules to check that the cached spec is current,
+        # so the cost grows with the number of routes
+        if not has_app_context() and self._apispec is not None:
+            # return the most recently generated spec
+            return self._apispec
+        return self._apispec_cache()['apispec']
+
+    def _apispec_cache(self):
+        # the generated spec only changes when the routes or the
+        # process_apispec callback change, so it is cached in the
+        # application, along with the values it was generated from
+        rules = tuple(
+            (rule.rule, rule.endpoint, tuple(sorted(rule.methods or ())))
+            for rule in current_app.url_map.iter_rules())
+        key = (rules, self.apispec_callback)
+        # the 'apifairy' key is reserved for the extension instance itself
+        caches = current_app.extensions.setdefault('_apifairy_apispec', {})
+        cache = caches.get(self)
+        if cache is None or cache['key'] != key:
+            apispec = self._generate_apispec().to_dict()
             if self.apispec_callback:
-                self._apispec = self.apispec_callback(self._apispec)
-        return self._apispec
+                apispec = self.apispec_callback(apispec)
+            cache = caches[self] = {'key': key, 'apispec': apispec}
+        self._apispec = cache['apispec']
+        return cache
 
     def _generate_apispec(self):
         def resolver(schema):
@@ -191,6 +293,66 @@ class APIFairy:
         for name, scheme in security_schemes.items():
             spec.components.security_scheme(name, scheme)
 
+        # msgspec structs
+        structs = []
+        arg_structs = []
+        for rule in current_app.url_map.iter_rules():
+            view_func = current_app.view_functions[rule.endpoint]
+            if hasattr(view_func, '_spec'):
+                for schema, location in view_func._spec.get('args', []):
+                    if not _is_struct(schema):
+                        continue
+                    # form and JSON arguments are documented as the request
+                    # body, all others as parameters
+                    if location in _struct_media_types:
+                        if schema not in structs:
+                            structs.append(schema)
+                    elif schema not in arg_structs:
+                        arg_structs.append(schema)
+                for schema in [view_func._spec.get('body'),
+                               view_func._spec.get('response')]:
+                    if _is_struct(schema) and schema not in structs:
+                        structs.append(schema)
+        struct_refs = {}
+        if structs:
+            refs, components = msgspec.json.schema_components(
+                structs, ref_template='#/components/schemas/{name}')
+            for name, component in components.items():
+                spec.components.schema(name, _openapi_schema(component))
+            struct_refs = dict(zip(structs, refs))
+        arg_components = {}
+        if arg_structs:
+            # arguments are expanded into parameters, not components, so
+            # the definitions they reference (enums) are inlined
+            refs, components = msgspec.json.schema_components(
+                arg_structs, ref_template='{name}')
+
+            def inline(schema):
+                if isinstance(schema, list):
+                    return [inline(item) for item in schema]
+                if not isinstance(schema, dict):
+                    return schema
+                schema = {key: value if key in ['default', 'enum'] else
+                          inline(value) for key, value in schema.items()}
+                if '$ref' in schema:
+                    schema = {**inline(components[schema.pop('$ref')]),
+                              **schema}
+                return schema
+
+            arg_components = {
+                struct: _openapi_schema(inline(components[ref['$ref']]))
+                for struct, ref in zip(arg_structs, refs)}
+
+        def parameters(schema, location):
+            if not _is_struct(schema):
+                return [{'in': location, 'schema': schema}]
+            component = arg_components[schema]
+            required = component.get('required', [])
+            location = {'cookies': 'cookie'}.get(location, location)
+            return [{'in': location, 'name': field, 'schema': field_schema,
+                     'required': field in required}
+                    for field, field_schema in component['properties'].items()]
+
         # paths
         paths = {}
         rules = list(current_app.url_map.iter_rules())
@@ -206,13 +368,16 @@ class APIFairy:
             for method in ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']:
                 if method not in rule.methods:
                     continue
-                operation = {
-                    'parameters': [
-                        {'in': location, 'schema': schema}
-                        for schema, location in view_func._spec.get('args', [])
-                        if location != 'body'
-                    ],
-                }
+                operation = {'parameters': []}
+                content = {}
+                for schema, location in view_func._spec.get('args', []):
+                    if _is_struct(schema) and \
+                            location in _struct_media_types:
+                        content[_struct_media_types[location]] = {
+                            'schema': struct_refs[schema]}
+                    elif location != 'body':
+                        operation['parameters'] += parameters(schema,
+                                                              location)
                 if tag:
                     operation['tags'] = [tag]
                 docs = (view_func.__doc__ or '').strip().split('\n')
@@ -226,7 +391,9 @@ class APIFairy:
                         code: {
                             'content': {
                                 'application/json': {
-                                    'schema': view_func._spec.get('response')
+                                    'schema': struct_refs.get(
+                                        view_func._spec['response'],
+                                        view_func._spec['response'])
                                 }
                             }
                         }
@@ -243,13 +410,12 @@ class APIFairy:
                             {'description': description}
 
                 if view_func._spec.get('body'):
-                    operation['requestBody'] = {
-                        'content': {
-                            'application/json': {
-                                'schema': view_func._spec['body'],
-                            }
-                        }
+                    content['application/json'] = {
+                        'schema': struct_refs.get(view_func._spec['body'],
+                                                  view_func._spec['body']),
                     }
+                if content:
+                    operation['requestBody'] = {'content': content}
 
                 if view_func._spec.get('auth'):
                     operation['security'] = [{
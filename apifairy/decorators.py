@@ -1,7 +1,12 @@
 from functools import wraps
+from weakref import WeakValueDictionary
 
-from flask import Response
+from flask import Response, jsonify, request
 from webargs.flaskparser import FlaskParser as BaseFlaskParser
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
 
 from apifairy.exceptions import ValidationError
 
@@ -18,6 +23,23 @@ class FlaskParser(BaseFlaskParser):
 
 parser = FlaskParser()
 use_args = parser.use_args
+_schemas = WeakValueDictionary()
+
+
+def _get_json():
+    # like webargs, a missing or non-JSON body loads as no data, while a
+    # malformed JSON body is rejected by Flask with a 400 error
+    if not request.is_json or not request.get_data(cache=True):
+        return {}
+    return request.get_json()
+
+
+_struct_locations = {
+    'query': lambda: request.args.to_dict(),
+    'form': lambda: request.form.to_dict(),
+    'cookies': lambda: request.cookies.to_dict(),
+    'json': _get_json,
+}
 
 
 def _annotate(f, **kwargs):
@@ -27,6 +49,75 @@ def _annotate(f, **kwargs):
         f._spec[key] = value
 
 
+def _is_struct(schema):
+    return msgspec is not None and isinstance(schema, type) and \
+        issubclass(schema, msgspec.Struct)
+
+
+def _get_schema(schema):
+    if isinstance(schema, type) and not _is_struct(schema):
+        instance = _schemas.get(schema)
+        if instance is None:
+            instance = _schemas[schema] = schema()
+        schema = instance
+    return schema
+
+
+def _schema_types(schema, components):
+    if '$ref' in schema:
+        schema = components[schema['$ref']]
+    types = schema.get('type', [])
+    types = {types} if isinstance(types, str) else set(types)
+    for option in schema.get('anyOf', []) + schema.get('oneOf', []):
+        types |= _schema_types(option, components)
+    return types
+
+
+def _use_struct(struct, location, **kwargs):
+    if kwargs:
+        # these are webargs options, which have no msgspec equivalent
+        raise TypeError(f'Unsupported arguments for {struct.__name__}: '
+                        f'{", ".join(kwargs)}')
+    if location not in _struct_locations:
+        raise ValueError(f'Unsupported location for {struct.__name__}: '
+                         f'{location}')
+    if location != 'json':
+        # these locations have a single text value per key, so fields that
+        # expect a list or an object can never be loaded
+        (ref,), components = msgspec.json.schema_components(
+            [struct], ref_template='{name}')
+        properties = components[ref['$ref']].get('properties', {})
+        invalid = [name for name, schema in properties.items()
+                   if _schema_types(schema, components) & {'array', 'object'}]
+        if invalid:
+            raise ValueError(f'{struct.__name__} cannot be used for '
+                             f'{location} arguments, as it has list or '
+                             f'object fields: {", ".join(invalid)}')
+    get_data = _struct_locations[location]
+
+    def decorator(f):
+        @wraps(f)
+        def _struct_args(*args, **kwargs):
+            try:
+                # only JSON carries typed values, everything else is text
+                value = msgspec.convert(get_data(), struct,
+                                        strict=location == 'json')
+            except msgspec.ValidationError as exc:
+                raise ValidationError(
+                    FlaskParser.DEFAULT_VALIDATION_STATUS,
+                    {location: {'_schema': [str(exc)]}})
+            return f(*args, value, **kwargs)
+        return _struct_args
+    return decorator
+
+
+def _jsonify_struct(struct):
+    def _jsonify(obj):
+        return jsonify(msgspec.to_builtins(
+            msgspec.convert(obj, struct, from_attributes=True)))
+    return _jsonify
+
+
 def authenticate(auth, **kwargs):
     def decorator(f):
         roles = kwargs.get('role')
@@ -38,30 +129,39 @@ def authenticate(auth, **kwargs):
 
 
 def arguments(schema, location='query', **kwargs):
-    if isinstance(schema, type):  # pragma: no cover
-        schema = schema()
+    schema = _get_schema(schema)
+    if _is_struct(schema):
+        parse = _use_struct(schema, location, **kwargs)
+    else:
+        parse = use_args(schema, location=location, **kwargs)
 
     def decorator(f):
         if not hasattr(f, '_spec') or f._spec.get('args') is None:
             _annotate(f, args=[])
         f._spec['args'].append((schema, location))
-        return use_args(schema, location=location, **kwargs)(f)
+        return parse(f)
     return decorator
 
 
 def body(schema, **kwargs):
-    if isinstance(schema, type):  # pragma: no cover
-        schema = schema()
+    schema = _get_schema(schema)
+    if _is_struct(schema):
+        parse = _use_struct(schema, 'json', **kwargs)
+    else:
+        parse = use_args(schema, location='json', **kwargs)
 
     def decorator(f):
         _annotate(f, body=schema)
-        return use_args(schema, location='json', **kwargs)(f)
+        return parse(f)
     return decorator
 
 
 def response(schema, status_code=200, description=None):
-    if isinstance(schema, type):  # pragma: no cover
-        schema = schema()
+    schema = _get_schema(schema)
+    if _is_struct(schema):
+        schema_jsonify = _jsonify_struct(schema)
+    else:
+        schema_jsonify = schema.jsonify
 
     def decorator(f):
         _annotate(f, response=schema, status_code=status_code,
@@ -74,7 +174,7 @@ def response(schema, status_code=200, description=None):
                 raise RuntimeError(
                     'The @response decorator cannot handle Response objects.')
             if isinstance(rv, tuple):
-                json = schema.jsonify(rv[0])
+                json = schema_jsonify(rv[0])
                 if len(rv) == 2:
                     if not isinstance(rv[1], int):
                         rv = (json, status_code, rv[1])
@@ -86,7 +186,7 @@ def response(schema, status_code=200, description=None):
                     rv = json
                 return rv
             else:
-                return schema.jsonify(rv), status_code
+                return schema_jsonify(rv), status_code
         return _response
     return decorator
 
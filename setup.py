@@ -21,6 +21,9 @@ setuptools.setup(
         'flask-httpauth',
         'apispec',
     ],
+    extras_require={
+        'msgspec': ['msgspec'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
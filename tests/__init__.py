@@ -0,0 +1,8 @@
+import importlib.util
+import os
+
+# openapi-spec-validator reads these when it is first imported
+if importlib.util.find_spec('jsonschema_rs') is not None:
+    os.environ.setdefault('OPENAPI_SPEC_VALIDATOR_SCHEMA_VALIDATOR_BACKEND',
+                          'jsonschema-rs')
+os.environ.setdefault('OPENAPI_SPEC_VALIDATOR_RESOLVED_CACHE_MAXSIZE', '2048')
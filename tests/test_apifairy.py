@@ -1,313 +1,679 @@
-import unittest
-
-from flask import Flask
+from collections import namedtuple
+from enum import Enum
+from functools import lru_cache
+from hmac import compare_digest
+from io import BytesIO
+from json import dumps, loads
+import sys
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from flask import Blueprint, Flask
 from flask_httpauth import HTTPBasicAuth
 from flask_marshmallow import Marshmallow
 from marshmallow import EXCLUDE
 from openapi_spec_validator import validate_spec
+import pytest
+from werkzeug.datastructures import Headers
 
 from apifairy import APIFairy, body, arguments, response, authenticate, \
     other_responses
+from apifairy.core import _openapi_schema
+
+
+class Response(namedtuple('Response', 'status_code data headers')):
+    @property
+    def json(self):
+        return loads(self.data)
+
+
+def wsgi_call(app, method, url, json=None, data=None, content_type=None,
+              headers=None):
+    """Invoke the WSGI application directly and collect its response."""
+    path, _, query_string = url.partition('?')
+    if json is not None:
+        data = dumps(json).encode()
+        content_type = 'application/json'
+    elif isinstance(data, dict):
+        data = urlencode(data).encode()
+        content_type = 'application/x-www-form-urlencoded'
+    data = data or b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'CONTENT_LENGTH': str(len(data)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(data),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if content_type is not None:
+        environ['CONTENT_TYPE'] = content_type
+    for name, value in (headers or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
 
+    body = bytearray()
+    status = []
 
-class TestAPIFairy(unittest.TestCase):
-    def test_body(self):
-        app = Flask(__name__)
-        ma = Marshmallow(app)
-        APIFairy(app)
+    def start_response(status_line, response_headers, exc_info=None):
+        status[:] = [status_line, response_headers]
+        return body.extend
 
-        class Schema(ma.Schema):
-            id = ma.Integer()
-            name = ma.Str(required=True)
+    app_iter = app.wsgi_app(environ, start_response)
+    try:
+        for chunk in app_iter:
+            body.extend(chunk)
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+    return Response(int(status[0].split(' ', 1)[0]), bytes(body),
+                    Headers(status[1]))
 
-        @app.route('/foo', methods=['POST'])
-        @body(Schema())
-        def foo(schema):
-            return schema
 
-        client = app.test_client()
+def _json_bytes(data):
+    """Serialize data the way Flask's jsonify() does outside debug mode."""
+    return dumps(data, separators=(',', ':'), sort_keys=True).encode() + \
+        b'\n'
 
-        rv = client.post('/foo')
-        assert rv.status_code == 400
-        assert rv.json == {
-            'messages': {
-                'json': {'name': ['Missing data for required field.']}
-            }
-        }
 
-        rv = client.post('/foo', json={'id': 1})
-        assert rv.status_code == 400
-        assert rv.json == {
-            'messages': {
-                'json': {'name': ['Missing data for required field.']}
-            }
-        }
+def _missing_field_error(location, field):
+    return _json_bytes({
+        'messages': {location: {field: ['Missing data for required field.']}}
+    })
 
-        rv = client.post('/foo', json={'id': 1, 'name': 'bar'})
-        assert rv.status_code == 200
-        assert rv.json == {'id': 1, 'name': 'bar'}
 
-        rv = client.post('/foo', json={'name': 'bar'})
-        assert rv.status_code == 200
-        assert rv.json == {'name': 'bar'}
+_ERR_NAME_MISSING_JSON = _missing_field_error('json', 'name')
+_ERR_NAME_MISSING_QUERY = _missing_field_error('query', 'name')
+_ERR_NAME2_MISSING_QUERY = _missing_field_error('query', 'name2')
 
-    def test_query(self):
-        app = Flask(__name__)
-        ma = Marshmallow(app)
-        apifairy = APIFairy()
-        apifairy.init_app(app)
 
-        class Schema(ma.Schema):
-            class Meta:
-                unknown = EXCLUDE
+class Client:
+    """Stand-in for the Flask test client that goes through wsgi_call()."""
+    def __init__(self, app):
+        self.app = app
 
-            id = ma.Integer()
-            name = ma.Str(required=True)
+    def get(self, url, **kwargs):
+        return wsgi_call(self.app, 'GET', url, **kwargs)
 
-        class Schema2(ma.Schema):
-            class Meta:
-                unknown = EXCLUDE
+    def post(self, url, **kwargs):
+        return wsgi_call(self.app, 'POST', url, **kwargs)
 
-            id2 = ma.Integer()
-            name2 = ma.Str(required=True)
 
-        @app.route('/foo', methods=['POST'])
-        @arguments(Schema())
-        @arguments(Schema2())
-        def foo(schema, schema2):
-            return {'name': schema['name'], 'name2': schema2['name2']}
+Env = namedtuple('Env', 'app ma apifairy client schemas')
 
-        client = app.test_client()
 
-        rv = client.post('/foo')
-        assert rv.status_code == 400
-        assert rv.json == {
-            'messages': {
-                'query': {'name': ['Missing data for required field.']}
-            }
-        }
+@lru_cache(maxsize=None)
+def _make_env(name):
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    ma = Marshmallow(app)
+    apifairy = APIFairy()
+    apifairy.init_app(app)
 
-        rv = client.post('/foo?id=1&name=bar')
-        assert rv.status_code == 400
-        assert rv.json == {
-            'messages': {
-                'query': {'name2': ['Missing data for required field.']}
-            }
-        }
+    class Schema(ma.Schema):
+        id = ma.Integer(default=123)
+        name = ma.Str()
 
-        rv = client.post('/foo?id=1&name=bar&id2=2&name2=baz')
-        assert rv.status_code == 200
-        assert rv.json == {'name': 'bar', 'name2': 'baz'}
-
-        rv = client.post('/foo?name=bar&name2=baz')
-        assert rv.status_code == 200
-        assert rv.json == {'name': 'bar', 'name2': 'baz'}
-
-    def test_response(self):
-        app = Flask(__name__)
-        ma = Marshmallow(app)
-        APIFairy(app)
-
-        class Schema(ma.Schema):
-            id = ma.Integer(default=123)
-            name = ma.Str()
-
-        class QuerySchema(ma.Schema):
-            id = ma.Integer(missing=1)
-
-        @app.route('/foo')
-        @response(Schema())
-        def foo():
-            return {'name': 'bar'}
-
-        @app.route('/bar')
-        @response(Schema(), status_code=201)
-        def bar():
-            return {'name': 'foo'}
-
-        @app.route('/baz')
-        @arguments(QuerySchema)
-        @response(Schema(), status_code=201)
-        def baz(query):
-            if query['id'] == 1:
-                return {'name': 'foo'}, 202
-            elif query['id'] == 2:
-                return {'name': 'foo'}, {'Location': '/baz'}
-            elif query['id'] == 3:
-                return {'name': 'foo'}, 202, {'Location': '/baz'}
-            return ({'name': 'foo'},)
-
-        client = app.test_client()
-
-        rv = client.get('/foo')
-        assert rv.status_code == 200
-        assert rv.json == {'id': 123, 'name': 'bar'}
-
-        rv = client.get('/bar')
-        assert rv.status_code == 201
-        assert rv.json == {'id': 123, 'name': 'foo'}
-
-        rv = client.get('/baz')
-        assert rv.status_code == 202
-        assert rv.json == {'id': 123, 'name': 'foo'}
-        assert 'Location' not in rv.headers
-
-        rv = client.get('/baz?id=2')
-        assert rv.status_code == 201
-        assert rv.json == {'id': 123, 'name': 'foo'}
-        assert rv.headers['Location'] == 'http://localhost/baz'
-
-        rv = client.get('/baz?id=3')
-        assert rv.status_code == 202
-        assert rv.json == {'id': 123, 'name': 'foo'}
-        assert rv.headers['Location'] == 'http://localhost/baz'
-
-        rv = client.get('/baz?id=4')
-        assert rv.status_code == 200
-        assert rv.json == {'id': 123, 'name': 'foo'}
-        assert 'Location' not in rv.headers
-
-    def test_authenticate(self):
-        app = Flask(__name__)
-        auth = HTTPBasicAuth()
-        APIFairy(app)
-
-        @auth.verify_password
-        def verify_password(username, password):
-            if username == 'foo' and password == 'bar':
-                return {'user': 'foo'}
-            elif username == 'bar' and password == 'foo':
-                return {'user': 'bar'}
-
-        @auth.get_user_roles
-        def get_roles(user):
-            if user['user'] == 'bar':
-                return 'admin'
-            return 'normal'
-
-        @app.route('/foo')
-        @authenticate(auth)
-        def foo():
-            return auth.current_user()
-
-        @app.route('/bar')
-        @authenticate(auth, role='admin')
-        def bar():
-            return auth.current_user()
-
-        client = app.test_client()
-
-        rv = client.get('/foo')
-        assert rv.status_code == 401
-
-        rv = client.get('/foo',
-                        headers={'Authorization': 'Basic Zm9vOmJhcg=='})
-        assert rv.status_code == 200
-        assert rv.json == {'user': 'foo'}
-
-        rv = client.get('/bar',
-                        headers={'Authorization': 'Basic Zm9vOmJhcg=='})
-        assert rv.status_code == 403
-
-        rv = client.get('/foo',
-                        headers={'Authorization': 'Basic YmFyOmZvbw=='})
-        assert rv.status_code == 200
-        assert rv.json == {'user': 'bar'}
-
-        rv = client.get('/bar',
-                        headers={'Authorization': 'Basic YmFyOmZvbw=='})
-        assert rv.status_code == 200
-        assert rv.json == {'user': 'bar'}
-
-    def test_apispec(self):
-        app = Flask(__name__)
-        auth = HTTPBasicAuth()
-        ma = Marshmallow(app)
-        apifairy = APIFairy(app)
-
-        class Schema(ma.Schema):
-            id = ma.Integer(default=123)
-            name = ma.Str()
-
-        class QuerySchema(ma.Schema):
-            id = ma.Integer(missing=1)
-
-        @apifairy.process_apispec
-        def edit_apispec(apispec):
-            assert apispec['openapi'] == '3.0.3'
-            apispec['openapi'] = '3.0.2'
-            return apispec
-
-        @auth.verify_password
-        def verify_password(username, password):
-            if username == 'foo' and password == 'bar':
-                return {'user': 'foo'}
-            elif username == 'bar' and password == 'foo':
-                return {'user': 'bar'}
-
-        @auth.get_user_roles
-        def get_roles(user):
-            if user['user'] == 'bar':
-                return 'admin'
-            return 'normal'
-
-        @app.route('/foo')
-        @authenticate(auth)
-        @arguments(QuerySchema)
-        @body(Schema)
-        @response(Schema)
-        @other_responses({404: 'foo not found'})
-        def foo():
-            return {'id': 123, 'name': auth.current_user()['user']}
-
-        client = app.test_client()
-
-        rv = client.get('/apispec.json')
-        assert rv.status_code == 200
-        validate_spec(rv.json)
-        assert rv.json['openapi'] == '3.0.2'
-
-        assert apifairy.apispec is apifairy.apispec
-
-        rv = client.get('/docs')
-        assert rv.status_code == 200
-        assert b'redoc.standalone.js' in rv.data
-
-    def test_apispec_schemas(self):
-        app = Flask(__name__)
-        ma = Marshmallow(app)
-        apifairy = APIFairy(app)
-
-        class Schema(ma.Schema):
-            id = ma.Integer(default=123)
-            name = ma.Str()
-
-        class Schema2(ma.Schema):
-            id = ma.Integer(default=123)
-            name = ma.Str()
-
-        class FooSchema(ma.Schema):
-            id = ma.Integer(default=123)
-            name = ma.Str()
-
-        @app.route('/foo')
-        @response(Schema(partial=True))
-        def foo():
-            pass
+    class QuerySchema(ma.Schema):
+        id = ma.Integer(missing=1)
 
-        @app.route('/bar')
-        @response(Schema2(many=True))
-        def bar():
-            pass
+    return Env(app, ma, apifairy, Client(app),
+               {'Schema': Schema, 'QuerySchema': QuerySchema})
+
+
+@pytest.fixture(scope='session')
+def env(request):
+    """Return the test environment selected by an indirect parameter.
+
+    Tests that do not select one run against the shared application.
+    """
+    return _make_env(getattr(request, 'param', 'shared'))
+
+
+@pytest.fixture
+def app_ctx(env):
+    with env.app.app_context() as ctx:
+        yield ctx
+
+
+SHARED = _make_env('shared')
+
+
+def _body_blueprint(env):
+    bp = Blueprint('body', __name__)
+
+    class Schema(env.ma.Schema):
+        id = env.ma.Integer()
+        name = env.ma.Str(required=True)
+
+    @bp.route('/foo', methods=['POST'])
+    @body(Schema())
+    def foo(schema):
+        return schema
+
+    return bp
+
+
+SHARED.app.register_blueprint(_body_blueprint(SHARED),
+                              url_prefix='/body')
+
+
+def test_body(env):
+    rv = env.client.post('/body/foo')
+    assert rv.status_code == 400
+    assert rv.data == _ERR_NAME_MISSING_JSON
+
+    rv = env.client.post('/body/foo', json={'id': 1})
+    assert rv.status_code == 400
+    assert rv.data == _ERR_NAME_MISSING_JSON
+
+    rv = env.client.post('/body/foo', json={'id': 1, 'name': 'bar'})
+    assert rv.status_code == 200
+    assert rv.json == {'id': 1, 'name': 'bar'}
+
+    rv = env.client.post('/body/foo', json={'name': 'bar'})
+    assert rv.status_code == 200
+    assert rv.json == {'name': 'bar'}
 
-        @app.route('/baz')
-        @response(FooSchema)
-        def baz():
+
+def _query_blueprint(env):
+    bp = Blueprint('query', __name__)
+
+    class Schema(env.ma.Schema):
+        class Meta:
+            unknown = EXCLUDE
+
+        id = env.ma.Integer()
+        name = env.ma.Str(required=True)
+
+    class Schema2(env.ma.Schema):
+        class Meta:
+            unknown = EXCLUDE
+
+        id2 = env.ma.Integer()
+        name2 = env.ma.Str(required=True)
+
+    @bp.route('/foo', methods=['POST'])
+    @arguments(Schema())
+    @arguments(Schema2())
+    def foo(schema, schema2):
+        return {'name': schema['name'], 'name2': schema2['name2']}
+
+    return bp
+
+
+SHARED.app.register_blueprint(_query_blueprint(SHARED),
+                              url_prefix='/query')
+
+
+def test_query(env):
+    rv = env.client.post('/query/foo')
+    assert rv.status_code == 400
+    assert rv.data == _ERR_NAME_MISSING_QUERY
+
+    rv = env.client.post('/query/foo?id=1&name=bar')
+    assert rv.status_code == 400
+    assert rv.data == _ERR_NAME2_MISSING_QUERY
+
+    rv = env.client.post('/query/foo?id=1&name=bar&id2=2&name2=baz')
+    assert rv.status_code == 200
+    assert rv.json == {'name': 'bar', 'name2': 'baz'}
+
+    rv = env.client.post('/query/foo?name=bar&name2=baz')
+    assert rv.status_code == 200
+    assert rv.json == {'name': 'bar', 'name2': 'baz'}
+
+
+def _response_blueprint(env):
+    bp = Blueprint('response', __name__)
+
+    QuerySchema = env.schemas['QuerySchema']
+    schema = env.schemas['Schema']()
+
+    @bp.route('/foo')
+    @response(schema)
+    def foo():
+        return {'name': 'bar'}
+
+    @bp.route('/bar')
+    @response(schema, status_code=201)
+    def bar():
+        return {'name': 'foo'}
+
+    @bp.route('/baz')
+    @arguments(QuerySchema)
+    @response(schema, status_code=201)
+    def baz(query):
+        if query['id'] == 1:
+            return {'name': 'foo'}, 202
+        elif query['id'] == 2:
+            return {'name': 'foo'}, {'Location': '/response/baz'}
+        elif query['id'] == 3:
+            return {'name': 'foo'}, 202, {'Location': '/response/baz'}
+        return ({'name': 'foo'},)
+
+    return bp
+
+
+SHARED.app.register_blueprint(_response_blueprint(SHARED),
+                              url_prefix='/response')
+
+RESPONSE_RESULTS = {
+    '/response/foo': (200, {'id': 123, 'name': 'bar'}, None),
+    '/response/bar': (201, {'id': 123, 'name': 'foo'}, None),
+    '/response/baz': (202, {'id': 123, 'name': 'foo'}, None),
+    '/response/baz?id=2': (201, {'id': 123, 'name': 'foo'},
+                           'http://localhost/response/baz'),
+    '/response/baz?id=3': (202, {'id': 123, 'name': 'foo'},
+                           'http://localhost/response/baz'),
+    '/response/baz?id=4': (200, {'id': 123, 'name': 'foo'}, None),
+}
+
+
+def test_response(env):
+    results = {}
+    for url in RESPONSE_RESULTS:
+        rv = env.client.get(url)
+        results[url] = (rv.status_code, rv.json, rv.headers.get('Location'))
+    assert results == RESPONSE_RESULTS
+
+
+def _authenticate_blueprint(env):
+    bp = Blueprint('authenticate', __name__)
+    auth = HTTPBasicAuth()
+
+    @auth.verify_password
+    def verify_password(username, password):
+        if username == 'foo' and compare_digest(password.encode(), b'bar'):
+            return {'user': 'foo'}
+        elif username == 'bar' and compare_digest(password.encode(), b'foo'):
+            return {'user': 'bar'}
+
+    @auth.get_user_roles
+    def get_roles(user):
+        if user['user'] == 'bar':
+            return 'admin'
+        return 'normal'
+
+    @bp.route('/foo')
+    @authenticate(auth)
+    def foo():
+        return auth.current_user()
+
+    @bp.route('/bar')
+    @authenticate(auth, role='admin')
+    def bar():
+        return auth.current_user()
+
+    return bp
+
+
+SHARED.app.register_blueprint(_authenticate_blueprint(SHARED),
+                              url_prefix='/authenticate')
+
+AUTH_FOO = 'Basic Zm9vOmJhcg=='  # foo:bar
+AUTH_BAR = 'Basic YmFyOmZvbw=='  # bar:foo
+
+AUTHENTICATE_RESULTS = {
+    ('/authenticate/foo', None): (401, None),
+    ('/authenticate/foo', AUTH_FOO): (200, {'user': 'foo'}),
+    ('/authenticate/bar', AUTH_FOO): (403, None),
+    ('/authenticate/foo', AUTH_BAR): (200, {'user': 'bar'}),
+    ('/authenticate/bar', AUTH_BAR): (200, {'user': 'bar'}),
+}
+
+
+def test_authenticate(env):
+    results = {}
+    for url, authorization in AUTHENTICATE_RESULTS:
+        headers = {'Authorization': authorization} if authorization else None
+        rv = env.client.get(url, headers=headers)
+        results[(url, authorization)] = (
+            rv.status_code, rv.json if rv.status_code == 200 else None)
+    assert results == AUTHENTICATE_RESULTS
+
+
+@pytest.mark.parametrize('env', ['apispec'], indirect=True)
+def test_apispec(env, app_ctx):
+    app, apifairy = env.app, env.apifairy
+    Schema = env.schemas['Schema']
+    QuerySchema = env.schemas['QuerySchema']
+    auth = HTTPBasicAuth()
+
+    @apifairy.process_apispec
+    def edit_apispec(apispec):
+        assert apispec['openapi'] == '3.0.3'
+        apispec['openapi'] = '3.0.2'
+        return apispec
+
+    @auth.verify_password
+    def verify_password(username, password):
+        if username == 'foo' and compare_digest(password.encode(), b'bar'):
+            return {'user': 'foo'}
+        elif username == 'bar' and compare_digest(password.encode(), b'foo'):
+            return {'user': 'bar'}
+
+    @auth.get_user_roles
+    def get_roles(user):
+        if user['user'] == 'bar':
+            return 'admin'
+        return 'normal'
+
+    @app.route('/foo')
+    @authenticate(auth)
+    @arguments(QuerySchema)
+    @body(Schema)
+    @response(Schema)
+    @other_responses({404: 'foo not found'})
+    def foo():
+        return {'id': 123, 'name': auth.current_user()['user']}
+
+    annotations = app.view_functions['foo']._spec
+    assert annotations['body'] is annotations['response']
+
+    rv = env.client.get('/apispec.json')
+    assert rv.status_code == 200
+    spec = rv.json
+    validate_spec(spec)
+    assert spec['openapi'] == '3.0.2'
+
+    spec = apifairy.apispec
+    assert spec is apifairy.apispec
+    assert spec['openapi'] == '3.0.2'
+
+    rv = env.client.get('/docs')
+    assert rv.status_code == 200
+    assert b'redoc.standalone.js' in rv.data
+
+
+@pytest.mark.parametrize('env', ['apispec_schemas'], indirect=True)
+def test_apispec_schemas(env, app_ctx):
+    app, ma, apifairy = env.app, env.ma, env.apifairy
+
+    class Schema(ma.Schema):
+        id = ma.Integer(default=123)
+        name = ma.Str()
+
+    class Schema2(ma.Schema):
+        id = ma.Integer(default=123)
+        name = ma.Str()
+
+    class FooSchema(ma.Schema):
+        id = ma.Integer(default=123)
+        name = ma.Str()
+
+    @app.route('/foo')
+    @response(Schema(partial=True))
+    def foo():
+        pass
+
+    @app.route('/bar')
+    @response(Schema2(many=True))
+    def bar():
+        pass
+
+    @app.route('/baz')
+    @response(FooSchema)
+    def baz():
+        pass
+
+    apispec = apifairy.apispec
+    assert apispec is apifairy.apispec
+    assert len(apispec['components']['schemas']) == 3
+    assert 'SchemaUpdate' in apispec['components']['schemas']
+    assert 'Schema2List' in apispec['components']['schemas']
+    assert 'Foo' in apispec['components']['schemas']
+
+    @app.route('/qux')
+    @response(Schema2)
+    def qux():
+        pass
+
+    assert apifairy.apispec is not apispec
+    assert apifairy.apispec is apifairy.apispec
+    assert '/qux' in apifairy.apispec['paths']
+
+
+def test_apispec_multiple_apps():
+    apifairy = APIFairy()
+    apps = [Flask(__name__), Flask(__name__)]
+    for i, app in enumerate(apps):
+        Marshmallow(app)
+        apifairy.init_app(app)
+
+        @app.route(f'/app{i}')
+        @response(SHARED.schemas['Schema']())
+        def index():
             pass
 
+    for i, app in enumerate(apps):
         with app.app_context():
-            apispec = apifairy.apispec
-        assert len(apispec['components']['schemas']) == 3
-        assert 'SchemaUpdate' in apispec['components']['schemas']
-        assert 'Schema2List' in apispec['components']['schemas']
-        assert 'Foo' in apispec['components']['schemas']
+            assert list(apifairy.apispec['paths']) == [f'/app{i}']
+        assert Client(app).get('/apispec.json').json['paths'] == \
+            apifairy.apispec['paths']
+
+    # outside of an app context the last generated spec is returned
+    assert list(apifairy.apispec['paths']) == ['/app1']
+
+
+@pytest.mark.parametrize('env', ['msgspec'], indirect=True)
+def test_msgspec(env, app_ctx):
+    msgspec = pytest.importorskip('msgspec')
+    from typing import Literal  # msgspec requires Python 3.8
+    app = env.app
+
+    class BodySchema(msgspec.Struct):
+        name: str
+        id: int = msgspec.UNSET
+        nickname: Optional[str] = None
+
+    class QuerySchema(msgspec.Struct):
+        id: int = 1
+
+    class KindSchema(msgspec.Struct):
+        kind: Literal['user'] = 'user'
+        deleted: None = None
+
+    @app.route('/foo', methods=['POST'])
+    @body(BodySchema)
+    @response(BodySchema, status_code=201)
+    def foo(data):
+        return data
+
+    @app.route('/bar')
+    @arguments(QuerySchema)
+    @response(BodySchema)
+    def bar(query):
+        return {'id': query.id, 'name': 'bar', 'nickname': 'baz'}
+
+    @app.route('/baz')
+    @response(KindSchema)
+    def baz():
+        return {}
+
+    rv = env.client.post('/foo')
+    assert rv.status_code == 400
+    assert rv.json == {
+        'messages': {
+            'json': {'_schema': ['Object missing required field `name`']}
+        }
+    }
+
+    rv = env.client.post('/foo', data=b'{bad',
+                         content_type='application/json')
+    assert rv.status_code == 400
+    assert b'Bad Request' in rv.data
+
+    rv = env.client.post('/foo', json={'id': 'x', 'name': 'bar'})
+    assert rv.status_code == 400
+    assert rv.json == {
+        'messages': {
+            'json': {'_schema': ['Expected `int`, got `str` - at `$.id`']}
+        }
+    }
+
+    rv = env.client.post('/foo', json={'name': 'bar'})
+    assert rv.status_code == 201
+    assert rv.json == {'name': 'bar', 'nickname': None}
+
+    rv = env.client.get('/bar')
+    assert rv.status_code == 200
+    assert rv.json == {'id': 1, 'name': 'bar', 'nickname': 'baz'}
+
+    rv = env.client.get('/bar?id=2')
+    assert rv.status_code == 200
+    assert rv.json == {'id': 2, 'name': 'bar', 'nickname': 'baz'}
+
+    rv = env.client.get('/bar?id=x')
+    assert rv.status_code == 400
+    assert list(rv.json['messages']) == ['query']
+
+    rv = env.client.get('/apispec.json')
+    assert rv.status_code == 200
+    spec = rv.json
+    validate_spec(spec)
+    assert set(spec['components']['schemas']) == {'BodySchema', 'KindSchema'}
+    assert spec['components']['schemas']['BodySchema']['properties'][
+        'nickname'] == {'type': 'string', 'nullable': True, 'default': None}
+    assert spec['components']['schemas']['KindSchema']['properties'] == {
+        'kind': {'enum': ['user'], 'default': 'user'},
+        'deleted': {'nullable': True, 'enum': [None], 'default': None},
+    }
+    assert _openapi_schema({'const': 'user'}) == {'enum': ['user']}
+    assert _openapi_schema({'anyOf': [{'type': 'null'}]}) == {
+        'nullable': True, 'enum': [None]}
+    assert spec['paths']['/foo']['post']['requestBody']['content'][
+        'application/json']['schema']['$ref'] == \
+        '#/components/schemas/BodySchema'
+    assert spec['paths']['/bar']['get']['parameters'] == [{
+        'in': 'query',
+        'name': 'id',
+        'schema': {'type': 'integer', 'default': 1},
+        'required': False,
+    }]
+
+
+@pytest.mark.parametrize('env', ['msgspec_arguments'], indirect=True)
+def test_msgspec_arguments(env, app_ctx):
+    msgspec = pytest.importorskip('msgspec')
+    app = env.app
+
+    class Color(Enum):
+        red = 'red'
+        blue = 'blue'
+
+    class Inner(msgspec.Struct):
+        x: int
+
+    class NestedSchema(msgspec.Struct):
+        id: int
+        inner: Optional[Inner] = None
+        tags: List[str] = []
+        extra: Dict[str, str] = {}
+
+    class QuerySchema(msgspec.Struct):
+        color: Color = Color.red
+
+    class FormSchema(msgspec.Struct):
+        name: str
+
+    class CookieSchema(msgspec.Struct):
+        id: int
+
+    with pytest.raises(ValueError,
+                       match='list or object fields: inner, tags, extra'):
+        arguments(NestedSchema)
+    with pytest.raises(ValueError, match='form arguments'):
+        arguments(NestedSchema, location='form')
+    arguments(NestedSchema, location='json')
+    with pytest.raises(ValueError, match='Unsupported location'):
+        arguments(CookieSchema, location='headers')
+    with pytest.raises(TypeError, match='Unsupported arguments'):
+        arguments(CookieSchema, error_status_code=422)
+    with pytest.raises(TypeError, match='Unsupported arguments'):
+        body(CookieSchema, validate=lambda data: True)
+
+    @app.route('/foo')
+    @arguments(QuerySchema)
+    @response(QuerySchema)
+    def foo(query):
+        return query
+
+    @app.route('/form', methods=['POST'])
+    @arguments(FormSchema, location='form')
+    @response(FormSchema)
+    def form(form):
+        return form
+
+    @app.route('/cookies')
+    @arguments(CookieSchema, location='cookies')
+    @response(CookieSchema)
+    def cookies(cookies):
+        return cookies
+
+    @app.route('/json', methods=['POST'])
+    @arguments(CookieSchema, location='json')
+    @response(CookieSchema)
+    def json(json):
+        return json
+
+    rv = env.client.get('/foo?color=blue')
+    assert rv.status_code == 200
+    assert rv.json == {'color': 'blue'}
+
+    rv = env.client.post('/form', data={'name': 'foo'})
+    assert rv.status_code == 200
+    assert rv.json == {'name': 'foo'}
+    rv = env.client.post('/form', data={})
+    assert rv.status_code == 400
+    assert list(rv.json['messages']['form']) == ['_schema']
+
+    rv = env.client.get('/cookies', headers={'Cookie': 'id=3'})
+    assert rv.status_code == 200
+    assert rv.json == {'id': 3}
+    rv = env.client.get('/cookies', headers={'Cookie': 'id=x'})
+    assert rv.status_code == 400
+
+    rv = env.client.post('/json', json={'id': 3})
+    assert rv.status_code == 200
+    assert rv.json == {'id': 3}
+    rv = env.client.post('/json', json={'id': '3'})
+    assert rv.status_code == 400
+
+    rv = env.client.get('/apispec.json')
+    assert rv.status_code == 200
+    spec = rv.json
+    validate_spec(spec)
+    assert 'Color' in spec['components']['schemas']
+    assert spec['paths']['/foo']['get']['parameters'] == [{
+        'in': 'query',
+        'name': 'color',
+        'schema': {'title': 'Color', 'enum': ['blue', 'red'],
+                   'default': 'red'},
+        'required': False,
+    }]
+    assert spec['paths']['/form']['post']['parameters'] == []
+    assert spec['paths']['/form']['post']['requestBody']['content'][
+        'application/x-www-form-urlencoded']['schema']['$ref'] == \
+        '#/components/schemas/FormSchema'
+    assert spec['paths']['/json']['post']['parameters'] == []
+    assert list(spec['paths']['/json']['post']['requestBody'][
+        'content']) == ['application/json']
+    assert spec['paths']['/json']['post']['requestBody']['content'][
+        'application/json']['schema']['$ref'] == \
+        '#/components/schemas/CookieSchema'
+    assert spec['paths']['/cookies']['get']['parameters'] == [{
+        'in': 'cookie',
+        'name': 'id',
+        'schema': {'type': 'integer'},
+        'required': True,
+    }]